@@ -11,89 +11,163 @@ import os
 import sys
 import re
 from glob import glob
-from typing import List, Tuple
+from multiprocessing import Pool
 
+import numpy as np
 import pandas as pd
 
-# ─── TICKER → INDUSTRY MAPPING ────────────────────────────────────────────────
-INDUSTRY_LABELS = {
-    "XLK":  "Technology",
-    "XLF":  "Financials",
-    "XLE":  "Energy",
-    "XLI":  "Industrials",
-    "XLP":  "Consumer Staples",
-    "XLU":  "Utilities",
-    "XLV":  "Health Care",
-    "XLY":  "Consumer Discretionary",
-    "XLB":  "Materials",
-    "XLRE": "Real Estate",
-    "XLC":  "Communication Services",
-}
-# ────────────────────────────────────────────────────────────────────────────────
-
-def derive_title(stem: str) -> str:
-    """Generate a human-friendly title from the CSV stem."""
-    s = stem.lower()
-    if "annual" in s:
-        return "Annual % Correlation"
-    if "yoy" in s or "year" in s:
-        return "Year-over-Year % Correlation"
-    if "volatility" in s or "vol" in s:
-        return "Volatility Correlation"
-    return "Daily % Correlation"
-
-def flatten_corr(
-    corr: pd.DataFrame
-) -> List[Tuple[str,str,float]]:
-    """Return list of (ticker1, ticker2, corr_val) for each i<j."""
-    tickers = corr.columns.tolist()
-    pairs = []
-    for i in range(len(tickers)):
-        for j in range(i+1, len(tickers)):
-            pairs.append((tickers[i], tickers[j], corr.iat[i, j]))
-    return pairs
-
-def analyze_csv(path: str, top_n: int = 5):
-    """Load one CSV and print its filename, title, and top/bottom correlated pairs."""
-    base = os.path.basename(path)
-    stem = os.path.splitext(base)[0]
-    title = derive_title(stem)
-    print(f"\n=== {base} ===")
-    print(f"Dataset: {base}")
-    print(f"Title: {title}\n")
+try:
+    from numba import njit
+except ImportError:          # numba is optional; fall back to the NumPy path
+    njit = None
 
-    df = pd.read_csv(path, index_col=0)
-    if df.shape[0] != df.shape[1]:
-        print(f"⚠️  Skipping {base}: not a square matrix ({df.shape})\n")
-        return
+from sector_common import INDUSTRY_LABELS, derive_title
+
+# Vectorized ticker → industry translation, built once at import; unknown
+# tickers (e.g. SPY) pass through unchanged.
+_label_for = np.vectorize(lambda t: INDUSTRY_LABELS.get(t, t), otypes=[object])
+
+def _topk_pairs_py(C: np.ndarray, k: int):
+    """
+    Walk the upper triangle of `C` keeping the k smallest and k largest
+    entries in two small insertion-sorted buffers. Returns
+    (lo_i, lo_j, lo_vals, hi_i, hi_j, hi_vals) with lo ascending and hi
+    descending. Never materializes the full O(N^2) pair list.
+    """
+    n = C.shape[0]
+    m = n * (n - 1) // 2
+    if k > m:
+        k = m
+    lo_i = np.zeros(k, np.int64); lo_j = np.zeros(k, np.int64)
+    hi_i = np.zeros(k, np.int64); hi_j = np.zeros(k, np.int64)
+    lo_v = np.full(k, np.inf)
+    hi_v = np.full(k, -np.inf)
+    for i in range(n):
+        for j in range(i + 1, n):
+            v = C[i, j]
+            if v < lo_v[k - 1]:
+                p = k - 1
+                while p > 0 and lo_v[p - 1] > v:
+                    lo_v[p] = lo_v[p - 1]; lo_i[p] = lo_i[p - 1]; lo_j[p] = lo_j[p - 1]
+                    p -= 1
+                lo_v[p] = v; lo_i[p] = i; lo_j[p] = j
+            if v > hi_v[k - 1]:
+                p = k - 1
+                while p > 0 and hi_v[p - 1] < v:
+                    hi_v[p] = hi_v[p - 1]; hi_i[p] = hi_i[p - 1]; hi_j[p] = hi_j[p - 1]
+                    p -= 1
+                hi_v[p] = v; hi_i[p] = i; hi_j[p] = j
+    return lo_i, lo_j, lo_v, hi_i, hi_j, hi_v
+
+def _topk_pairs_np(C: np.ndarray, k: int):
+    """
+    Vectorized equivalent of `_topk_pairs_py`: gather the upper triangle
+    with one fancy-index, then select the k extremes via np.argpartition
+    (O(M)) and sort only the k survivors.
+    """
+    iu, ju = np.triu_indices(C.shape[0], k=1)
+    vals = C[iu, ju]
+    if k > vals.size:
+        k = vals.size
+    lo = np.argpartition(vals, k - 1)[:k]
+    lo = lo[np.argsort(vals[lo])]
+    hi = np.argpartition(-vals, k - 1)[:k]
+    hi = hi[np.argsort(-vals[hi])]
+    return iu[lo], ju[lo], vals[lo], iu[hi], ju[hi], vals[hi]
+
+# JIT-compile the pair walk when numba is present; the loop body is pure
+# numeric indexing, so it compiles to machine code with no Python cost.
+# Without numba, the interpreted loop would be the slowest option, so the
+# argpartition path takes over instead.
+topk_pairs = njit(cache=True)(_topk_pairs_py) if njit is not None else _topk_pairs_np
 
-    pairs = flatten_corr(df)
-    dfp = pd.DataFrame(pairs, columns=["Sector1","Sector2","Correlation"])
+def read_corr_csv(path: str) -> pd.DataFrame:
+    """Load a correlation CSV, preferring pandas' multithreaded pyarrow engine."""
+    try:
+        return pd.read_csv(path, index_col=0, engine="pyarrow")
+    except ImportError:
+        return pd.read_csv(path, index_col=0)
 
-    least = dfp.nsmallest(top_n, "Correlation")
-    most  = dfp.nlargest(top_n,  "Correlation")
+def _load_corr(path: str):
+    """
+    Pool worker: parse one CSV into (basename, labels, values).
+    `values` is None (and the shape is returned in its place) when the
+    matrix is not square.
+    """
+    base = os.path.basename(path)
+    df = read_corr_csv(path)
+    if df.shape[0] != df.shape[1]:
+        return base, None, df.shape
+    return base, _label_for(df.columns.to_numpy()), df.to_numpy(dtype=np.float64)
+
+def _format_report(base, labels, lo_i, lo_j, lo_v, hi_i, hi_j, hi_v, top_n: int) -> str:
+    """Render the report for one CSV from its pre-computed top-k pairs."""
+    title = derive_title(os.path.splitext(base)[0])
+    lines = [f"\n=== {base} ===", f"Dataset: {base}", f"Title: {title}\n"]
+    if labels is None:
+        # lo_i carries the offending shape in the skip case
+        lines.append(f"⚠️  Skipping {base}: not a square matrix ({lo_i})\n")
+        return "\n".join(lines)
 
-    # Map to industry names
-    least["Sector1"] = least["Sector1"].map(lambda t: INDUSTRY_LABELS.get(t, t))
-    least["Sector2"] = least["Sector2"].map(lambda t: INDUSTRY_LABELS.get(t, t))
-    most ["Sector1"] = most ["Sector1"].map(lambda t: INDUSTRY_LABELS.get(t, t))
-    most ["Sector2"] = most ["Sector2"].map(lambda t: INDUSTRY_LABELS.get(t, t))
+    least = pd.DataFrame({"Sector1": labels[lo_i], "Sector2": labels[lo_j], "Correlation": lo_v})
+    most  = pd.DataFrame({"Sector1": labels[hi_i], "Sector2": labels[hi_j], "Correlation": hi_v})
+    lines.append(f"Top {top_n} least-correlated pairs:")
+    lines.append(least.to_string(index=False))
+    lines.append(f"\nTop {top_n} most-correlated pairs:")
+    lines.append(most.to_string(index=False))
+    lines.append("")
+    return "\n".join(lines)
 
-    print(f"Top {top_n} least-correlated pairs:")
-    print(least.to_string(index=False))
-    print(f"\nTop {top_n} most-correlated pairs:")
-    print(most.to_string(index=False))
-    print()
+def analyze_csv(path: str, top_n: int = 5) -> str:
+    """Load one CSV and return a report of its title and top/bottom correlated pairs."""
+    base, labels, values = _load_corr(path)
+    if labels is None:
+        return _format_report(base, None, values, None, None, None, None, None, top_n)
+    return _format_report(base, labels, *topk_pairs(values, top_n), top_n)
 
-def main():
+def main(top_n: int = 5):
     folder = sys.argv[1] if len(sys.argv) > 1 else "."
     csvs = sorted(glob(os.path.join(folder, "*.csv")))
     if not csvs:
         print(f"No CSV files found in {folder}", file=sys.stderr)
         sys.exit(1)
 
-    for path in csvs:
-        analyze_csv(path)
+    # Parsing is the per-file cost, so only that is fanned out across
+    # cores; ranking happens below in one vectorized pass per matrix size.
+    with Pool(processes=min(os.cpu_count(), len(csvs))) as pool:
+        loaded = pool.map(_load_corr, csvs)
+
+    reports = [None] * len(loaded)
+    by_size = {}
+    for pos, (base, labels, values) in enumerate(loaded):
+        if labels is None:
+            reports[pos] = _format_report(base, None, values, None, None, None, None, None, top_n)
+        else:
+            by_size.setdefault(values.shape[0], []).append(pos)
+
+    # Stack same-size matrices into one (F, N, N) array and take the
+    # top-k of every file's upper triangle in a single argpartition call.
+    for n, positions in by_size.items():
+        mats = np.stack([loaded[pos][2] for pos in positions])
+        iu, ju = np.triu_indices(n, k=1)
+        flat = mats[:, iu, ju]                      # (F, M)
+        k = min(top_n, flat.shape[1])
+        lo = np.argpartition(flat, k - 1, axis=1)[:, :k]
+        lo = np.take_along_axis(lo, np.argsort(np.take_along_axis(flat, lo, axis=1), axis=1), axis=1)
+        hi = np.argpartition(-flat, k - 1, axis=1)[:, :k]
+        hi = np.take_along_axis(hi, np.argsort(-np.take_along_axis(flat, hi, axis=1), axis=1), axis=1)
+        for row, pos in enumerate(positions):
+            base, labels, _ = loaded[pos]
+            l, h = lo[row], hi[row]
+            reports[pos] = _format_report(
+                base, labels,
+                iu[l], ju[l], flat[row, l],
+                iu[h], ju[h], flat[row, h],
+                top_n,
+            )
+
+    for report in reports:
+        print(report)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
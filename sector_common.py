@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+sector_common.py
+
+Constants and helpers shared by the sector-correlation scripts
+(analyze_sector_correlation.py, plot_sector_correlation.py): the
+ticker → industry mapping and the filename → title heuristic.
+"""
+
+# ─── TICKER → INDUSTRY MAPPING ────────────────────────────────────────────────
+INDUSTRY_LABELS = {
+    "XLK":  "Technology",
+    "XLF":  "Financials",
+    "XLE":  "Energy",
+    "XLI":  "Industrials",
+    "XLP":  "Consumer Staples",
+    "XLU":  "Utilities",
+    "XLV":  "Health Care",
+    "XLY":  "Consumer Discretionary",
+    "XLB":  "Materials",
+    "XLRE": "Real Estate",
+    "XLC":  "Communication Services",
+}
+# ────────────────────────────────────────────────────────────────────────────────
+
+def derive_title(stem: str) -> str:
+    """Generate a human-friendly title from the CSV stem."""
+    s = stem.lower()
+    if "annual" in s:
+        return "Annual % Correlation"
+    if "yoy" in s or "year" in s:
+        return "Year-over-Year % Correlation"
+    if "volatility" in s or "vol" in s:
+        return "Volatility Correlation"
+    return "Daily % Correlation"